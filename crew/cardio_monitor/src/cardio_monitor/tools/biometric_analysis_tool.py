@@ -6,6 +6,7 @@ Follows CrewAI's tool design patterns for file access.
 
 import json
 import statistics
+import time
 from datetime import datetime, timedelta
 from typing import Type
 from pydantic import BaseModel, Field
@@ -59,8 +60,13 @@ class AnalyzeBiometricsTool(BaseTool):
 
             # Read the biometric buffer using standard Python file operations
             try:
-                with open(actual_buffer_path, 'r') as f:
-                    content = f.read()
+                # The monitor appends in place; a read during a flush has no closing bracket yet, so read again
+                for _ in range(3):
+                    with open(actual_buffer_path, 'r') as f:
+                        content = f.read()
+                    if content.rstrip().endswith(']'):
+                        break
+                    time.sleep(0.05)
                 biometric_data = json.loads(content)
             except FileNotFoundError:
                 return f"Error: File not found at {actual_buffer_path}"
@@ -6,6 +6,7 @@ Provides unified access to FHIR, biometric, and pain journal data.
 
 import json
 import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from pathlib import Path
@@ -50,8 +51,14 @@ class PatientDataIntegrator:
             return {"status": "no_data", "message": "No biometric data available"}
         
         try:
-            with open(buffer_file, 'r') as f:
-                data = json.load(f)
+            # The monitor appends in place; a read during a flush has no closing bracket yet, so read again
+            for _ in range(3):
+                with open(buffer_file, 'r') as f:
+                    content = f.read()
+                if content.rstrip().endswith(']'):
+                    break
+                time.sleep(0.05)
+            data = json.loads(content)
             
             # Get the most recent events of each type
             latest_events = {}
@@ -320,8 +320,14 @@ def load_biometric_data_step(state: LangGraphState) -> LangGraphState:
         workspace_root = Path(__file__).parent.parent.parent
         buffer_path = str(workspace_root / "patient" / "biometric" / "buffer" / "simulation_biometrics.json")
         
-        with open(buffer_path, 'r') as f:
-            biometric_data = json.load(f)
+        # The monitor appends in place; a read during a flush has no closing bracket yet, so read again
+        for _ in range(3):
+            with open(buffer_path, 'r') as f:
+                content = f.read()
+            if content.rstrip().endswith(']'):
+                break
+            time.sleep(0.05)
+        biometric_data = json.loads(content)
         
         return {
             **state,
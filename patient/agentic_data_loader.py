@@ -7,6 +7,7 @@ from various sources and format it for different AI agents and monitoring system
 
 import json
 import os
+import time
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Union
 from datetime import datetime, timedelta
@@ -63,8 +64,14 @@ class AgenticPatientDataLoader:
             return []
         
         try:
-            with open(buffer_file, 'r') as f:
-                data = json.load(f)
+            # The monitor appends in place; a read during a flush has no closing bracket yet, so read again
+            for _ in range(3):
+                with open(buffer_file, 'r') as f:
+                    content = f.read()
+                if content.rstrip().endswith(']'):
+                    break
+                time.sleep(0.05)
+            data = json.loads(content)
             return data if isinstance(data, list) else []
         except Exception as e:
             print(f"Error loading biometric buffer: {e}")
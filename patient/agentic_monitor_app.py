@@ -6,11 +6,18 @@ Runs on port 8502 and displays real-time agent progress and results
 
 import streamlit as st
 import json
+import sys
 import time
 import threading
 from pathlib import Path
 from datetime import datetime
 
+# Put the repository root on sys.path once so the patient package and
+# root-level packages (agentic_types) import canonically
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
 def show_results(run_id, patient_name, timestamp, output_container):
     """Display the analysis results in a structured format"""
     try:
@@ -245,20 +252,11 @@ def start_analysis(run_id, patient_name, framework, timestamp):
     """Start the agentic analysis in a background thread"""
     try:
         # Import the integration module
-        import sys
-        from pathlib import Path
-        sys.path.insert(0, str(Path(__file__).parent))
-        
         try:
-            # Try package import first
             from patient.agentic_monitor_integration import AgenticMonitorIntegration
-        except ImportError:
-            try:
-                # Fallback to direct import
-                from agentic_monitor_integration import AgenticMonitorIntegration
-            except ImportError as e:
-                print(f"❌ Failed to import AgenticMonitorIntegration: {e}")
-                return False
+        except ImportError as e:
+            print(f"❌ Failed to import AgenticMonitorIntegration: {e}")
+            return False
         
         # Initialize integration and start analysis
         integration = AgenticMonitorIntegration()
@@ -5,25 +5,15 @@ Provides integration between the Streamlit patient monitor and various agentic s
 Acts as an orchestrator that delegates to framework-specific integrations.
 """
 
-import json
+import logging
 import tempfile
 from pathlib import Path
-import sys
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, Mapping, Optional
 import time
 
-# Ensure repository root is on sys.path for root-level packages
-ROOT_DIR = Path(__file__).parent.parent
-if str(ROOT_DIR) not in sys.path:
-    sys.path.insert(0, str(ROOT_DIR))
-
-try:
-    # When imported as part of a package
-    from .agentic_data_loader import AgenticPatientDataLoader
-except ImportError:
-    # When run directly
-    from agentic_data_loader import AgenticPatientDataLoader
+# The repository root is expected on sys.path (set up by the entry point,
+# e.g. agentic_monitor_app.py) so this module is imported as patient.*
+from .agentic_data_loader import AgenticPatientDataLoader
 
 from agentic_types.models import (
     Finding,
@@ -38,18 +28,13 @@ from agentic_types.models import (
 )
 
 # Import the new integration system
-try:
-    # Try relative import first (when used as part of the patient package)
-    from .integrations import get_integration, BaseIntegration
-except ImportError:
-    try:
-        # Try absolute import from patient package
-        from patient.integrations import get_integration, BaseIntegration
-    except ImportError:
-        # Final fallback - try direct import
-        import sys
-        sys.path.insert(0, str(Path(__file__).parent))
-        from integrations import get_integration, BaseIntegration
+from .integrations import get_integration, BaseIntegration
+from .integrations import _discovery
+
+logger = logging.getLogger(__name__)
+
+# Resolve the patient data directory once at import time
+_PATIENT_DIR = Path(__file__).resolve().parent
 
 
 class AgenticMonitorIntegration:
@@ -57,6 +42,7 @@ class AgenticMonitorIntegration:
     
     def __init__(self):
         """Initialize the integration orchestrator."""
+        self._patient_dir = _PATIENT_DIR
         self.framework_integrations = {}
         self._load_framework_integrations()
     
@@ -67,9 +53,9 @@ class AgenticMonitorIntegration:
             # For now, we'll keep the existing CrewAI logic as a fallback
             pass
         except Exception as e:
-            print(f"⚠️ Warning: Could not load framework integrations: {e}")
+            logger.warning("⚠️ Could not load framework integrations: %s", e)
     
-    def _discover_patient_file_paths(self, patient_name: str) -> Dict[str, str]:
+    def _discover_patient_file_paths(self, patient_name: str) -> Mapping[str, str]:
         """
         Discover all available file paths for a patient.
         This method centralizes path discovery so any framework can use the same paths.
@@ -78,111 +64,25 @@ class AgenticMonitorIntegration:
             patient_name: Name of the patient (e.g., 'allen', 'mark', 'zach')
             
         Returns:
-            Dictionary mapping path keys to absolute file paths
+            Read-only mapping of path keys to absolute file paths; callers that
+            need to modify it should take a copy with dict()
         """
-        # Get the patient directory (where this file is located)
-        patient_dir = Path(__file__).parent
-        
-        # Discover all available paths
-        paths = {}
-        
-        # Patient summary files
-        summary_file = patient_dir / f"{patient_name.lower()}_biometric_summary.json"
-        if summary_file.exists():
-            paths['patient_summary_path'] = str(summary_file)
-        
-        # FHIR records - find the specific file matching the patient name
-        fhir_dir = patient_dir / "generated_medical_records" / "fhir"
-        if fhir_dir.exists():
-            # Look for files that contain the patient name (case-insensitive)
-            for fhir_file in fhir_dir.glob("*.json"):
-                if patient_name.lower() in fhir_file.name.lower():
-                    paths['fhir_records_path'] = str(fhir_file)
-                    break
-        
-        # Pain diaries - find the specific file matching the patient name
-        pain_diaries_dir = patient_dir / "generated_medical_records" / "pain_diaries"
-        if pain_diaries_dir.exists():
-            for pain_file in pain_diaries_dir.glob("*.json"):
-                if patient_name.lower() in pain_file.name.lower():
-                    paths['pain_diary_path'] = str(pain_file)  # Use pain_diary_path for consistency
-                    break
-        
-        # Weight data - find the specific file matching the patient name
-        weight_data_dir = patient_dir / "biometric" / "weight"
-        if weight_data_dir.exists():
-            weight_file = weight_data_dir / f"{patient_name.lower()}.json"
-            if weight_file.exists():
-                paths['weight_data_path'] = str(weight_file)  # Changed from weight_data_dir
-        
-        return paths
+        return _discovery.discover_patient_file_paths(patient_name, self._patient_dir)
 
-    def _process_temporal_data(self, patient_name: str) -> Dict[str, Any]:
+    def _process_temporal_data(self, patient_name: str, file_paths: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
         """
         Process temporal data (weight and pain diary) by converting offset_ms to actual timestamps.
         
         Args:
             patient_name: Name of the patient
+            file_paths: Paths already returned by _discover_patient_file_paths, if the caller has them
             
         Returns:
             Dictionary with processed temporal data
         """
-        import json
-        from datetime import datetime, timedelta
-        
-        temporal_data = {
-            'weight_data': [],
-            'pain_diary_data': []
-        }
-        
-        try:
-            # Process weight data
-            weight_file = Path(__file__).parent / "biometric" / "weight" / f"{patient_name.lower()}.json"
-            if weight_file.exists():
-                with open(weight_file, 'r') as f:
-                    weight_data = json.load(f)
-                
-                for entry in weight_data:
-                    if isinstance(entry, dict) and 'offset_ms' in entry:
-                        # Convert offset_ms (milliseconds BEFORE current time) to actual timestamp
-                        current_time = datetime.now()
-                        offset_seconds = entry['offset_ms'] / 1000
-                        timestamp = current_time - timedelta(seconds=offset_seconds)
-                        
-                        processed_entry = entry.copy()
-                        processed_entry['timestamp'] = timestamp.isoformat()
-                        temporal_data['weight_data'].append(processed_entry)
-            
-            # Process pain diary data
-            pain_diaries_dir = Path(__file__).parent / "generated_medical_records" / "pain_diaries"
-            if pain_diaries_dir.exists():
-                for pain_file in pain_diaries_dir.glob("*.json"):
-                    if patient_name.lower() in pain_file.name.lower():
-                        with open(pain_file, 'r') as f:
-                            pain_data = json.load(f)
-                        
-                        for entry in pain_data:
-                            if isinstance(entry, dict) and 'offset_ms' in entry:
-                                # Convert offset_ms (milliseconds BEFORE current time) to actual timestamp
-                                current_time = datetime.now()
-                                offset_seconds = entry['offset_ms'] / 1000
-                                timestamp = current_time - timedelta(seconds=offset_seconds)
-                                
-                                processed_entry = entry.copy()
-                                processed_entry['timestamp'] = timestamp.isoformat()
-                                temporal_data['pain_diary_data'].append(processed_entry)
-                        break
-            
-            print(f"   🕒 Processed temporal data for {patient_name}:")
-            print(f"      Weight entries: {len(temporal_data['weight_data'])}")
-            print(f"      Pain diary entries: {len(temporal_data['pain_diary_data'])}")
-            
-        except Exception as e:
-            print(f"   ⚠️ Warning: Could not process temporal data for {patient_name}: {e}")
-        
-        return temporal_data
+        return _discovery.process_temporal_data(patient_name, self._patient_dir, file_paths)
 
-    def get_framework_data_paths(self, patient_name: str) -> Dict[str, str]:
+    def get_framework_data_paths(self, patient_name: str) -> Mapping[str, str]:
         """
         Get all available data paths for a patient.
         This method can be called by any framework to get the same path information.
@@ -191,7 +91,7 @@ class AgenticMonitorIntegration:
             patient_name: Name of the patient (e.g., 'allen', 'mark', 'zach')
             
         Returns:
-            Dictionary mapping path keys to absolute file paths
+            Read-only mapping of path keys to absolute file paths
         """
         return self._discover_patient_file_paths(patient_name)
 
@@ -212,10 +112,10 @@ class AgenticMonitorIntegration:
             # Use the new integration system
             try:
                 integration = get_integration(framework)
-                print(f"🚀 Using {framework} integration for analysis")
+                logger.info("🚀 Using %s integration for analysis", framework)
                 return integration.run_agentic_analysis(patient_name, run_id, timestamp=timestamp)
             except (ImportError, ValueError) as e:
-                print(f"❌ Integration system not available: {e}")
+                logger.error("❌ Integration system not available: %s", e)
                 return {
                     "success": False,
                     "error": f"Integration system not available: {str(e)}",
@@ -225,9 +125,7 @@ class AgenticMonitorIntegration:
                 }
                 
         except Exception as e:
-            print(f"❌ Error in agentic analysis: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Error in agentic analysis: %s", e)
             return {
                 "success": False,
                 "error": f"Error running agentic analysis: {str(e)}",
@@ -251,7 +149,7 @@ class AgenticMonitorIntegration:
             data_loader = AgenticPatientDataLoader(patient_name)
             return data_loader.get_latest_logs(limit)
         except Exception as e:
-            print(f"Error loading logs: {e}")
+            logger.error("Error loading logs: %s", e)
             return []
     
     def test_crew_availability(self) -> Dict[str, Any]:
@@ -2,6 +2,8 @@
 Integrations package for agentic monitoring frameworks.
 """
 
+from functools import lru_cache
+
 from .base_integration import BaseIntegration
 from .crewai_integration import CrewaiIntegration
 from .langgraph_integration import LangGraphIntegration
@@ -13,21 +15,21 @@ __all__ = [
     "LangGraphIntegration",
 ]
 
-# Framework registry - maps framework names to integration classes
+# Framework registry - maps lowercase framework names to integration classes
 FRAMEWORK_REGISTRY = {
     "crewai": CrewaiIntegration,
-    "Crewai": CrewaiIntegration,  # Handle both lowercase and title case
     "langgraph": LangGraphIntegration,
-    "Langgraph": LangGraphIntegration,
-    "LangGraph": LangGraphIntegration,
 }
 
 def get_integration(framework: str) -> BaseIntegration:
     """
     Get an integration instance for the specified framework.
     
+    Framework names are case-insensitive, and repeated calls for the same
+    framework share a single integration instance.
+    
     Args:
-        framework: Framework name (e.g., "crewai", "Crewai")
+        framework: Framework name (e.g., "crewai", "Crewai", "LangGraph")
         
     Returns:
         Integration instance
@@ -35,9 +37,15 @@ def get_integration(framework: str) -> BaseIntegration:
     Raises:
         ValueError: If framework is not supported
     """
-    if framework not in FRAMEWORK_REGISTRY:
+    key = framework.lower()
+    if key not in FRAMEWORK_REGISTRY:
         available = ", ".join(FRAMEWORK_REGISTRY.keys())
         raise ValueError(f"Unsupported framework: {framework}. Available frameworks: {available}")
     
-    integration_class = FRAMEWORK_REGISTRY[framework]
+    return _get_integration_instance(key)
+
+@lru_cache(maxsize=None)
+def _get_integration_instance(key: str) -> BaseIntegration:
+    """Create (once) the integration instance registered under a normalized key."""
+    integration_class = FRAMEWORK_REGISTRY[key]
     return integration_class()
@@ -0,0 +1,200 @@
+"""
+Shared patient data discovery for the integration layer.
+Used by BaseIntegration and AgenticMonitorIntegration so path discovery and
+temporal data processing live (and are cached) in one place.
+"""
+
+from typing import Dict, Any, List, Mapping, Optional, Tuple, Union
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from datetime import datetime
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _data_dirs(patient_dir: Path) -> Tuple[Path, Path, Path]:
+    """Resolve the (fhir, pain_diaries, weight) directories under a patient directory once."""
+    records_dir = patient_dir / "generated_medical_records"
+    return records_dir / "fhir", records_dir / "pain_diaries", patient_dir / "biometric" / "weight"
+
+
+def _mtime_ns(path: Union[str, Path]) -> int:
+    """Return a file or directory's mtime in nanoseconds, or 0 if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+@lru_cache(maxsize=16)
+def _scan_json_files(directory: Path, mtime_ns: int) -> Tuple[Tuple[str, str], ...]:
+    """Index a directory's JSON files; mtime_ns is part of the cache key so adding or removing a file rescans."""
+    try:
+        with os.scandir(directory) as it:
+            return tuple((entry.name.lower(), entry.path) for entry in it if entry.name.endswith(".json"))
+    except FileNotFoundError:
+        return ()
+
+
+def _list_json_files(directory: Path) -> Tuple[Tuple[str, str], ...]:
+    """List (lowercase name, path) pairs for the JSON files in a directory, from a cached index."""
+    mtime_ns = _mtime_ns(directory)
+    if not mtime_ns:
+        return ()
+    return _scan_json_files(directory, mtime_ns)
+
+
+def json_mtimes(directory: Path, prefix: str = "") -> Tuple[Tuple[str, int], ...]:
+    """
+    Snapshot (name, mtime_ns) for the JSON files in a directory whose names start with prefix.
+    Used as a cache key: it changes whenever one of those files is added, removed or rewritten.
+    """
+    try:
+        with os.scandir(directory) as it:
+            return tuple(sorted(
+                (entry.name, entry.stat().st_mtime_ns)
+                for entry in it if entry.name.startswith(prefix) and entry.name.endswith(".json")
+            ))
+    except FileNotFoundError:
+        return ()
+
+
+@lru_cache(maxsize=32)
+def _load_json_cached(path: str, mtime_ns: int) -> Any:
+    """Parse a JSON file, reusing the result until its mtime changes. Callers must not mutate it."""
+    with open(path, 'rb') as f:
+        return json.loads(f.read())
+
+
+def _load_json(path: Optional[Union[str, Path]]) -> Optional[Any]:
+    """Load a JSON file, returning None when there is no path or the file does not exist."""
+    if not path:
+        return None
+    mtime_ns = _mtime_ns(path)
+    if not mtime_ns:
+        return None
+    try:
+        return _load_json_cached(str(path), mtime_ns)
+    except FileNotFoundError:
+        return None
+
+
+def _timestamp_entries(data: Any) -> List[Dict[str, Any]]:
+    """Copy each offset_ms entry of a weight/pain diary list with an actual timestamp added."""
+    if not isinstance(data, list):
+        return []
+
+    # Validate the schema in one filtering pass so the conversion loop needs no per-entry checks
+    entries = [entry for entry in data if isinstance(entry, dict) and 'offset_ms' in entry]
+
+    if not entries:
+        return []
+
+    # Convert offset_ms (milliseconds BEFORE current time) to actual timestamps for the whole column at once
+    offsets_us = np.rint(np.fromiter((entry['offset_ms'] for entry in entries), dtype=np.float64, count=len(entries)) * 1000)
+    current_time = np.datetime64(datetime.now(), 'us')
+    timestamps = np.datetime_as_string(current_time - offsets_us.astype('timedelta64[us]'), unit='us')
+
+    return [{**entry, 'timestamp': timestamp} for entry, timestamp in zip(entries, timestamps.tolist())]
+
+
+@lru_cache(maxsize=32)
+def _discover_paths(patient_lower: str, patient_dir: Path, mtime_key: Tuple[int, ...]) -> Mapping[str, str]:
+    """
+    Discover a patient's data files and share the result as a read-only mapping.
+    mtime_key holds the scanned directories' mtimes, so adding or removing a file starts a fresh scan.
+    """
+    fhir_dir, pain_diaries_dir, weight_data_dir = _data_dirs(patient_dir)
+
+    # Discover all available paths
+    paths = {}
+
+    # Patient summary files
+    summary_file = patient_dir / f"{patient_lower}_biometric_summary.json"
+    if summary_file.exists():
+        paths['patient_summary_path'] = str(summary_file)
+
+    # FHIR records - find the specific file matching the patient name (case-insensitive)
+    fhir_path = next((path for name, path in _list_json_files(fhir_dir) if patient_lower in name), None)
+    if fhir_path:
+        paths['fhir_records_path'] = fhir_path
+
+    # Pain diaries - find the specific file matching the patient name
+    pain_path = next((path for name, path in _list_json_files(pain_diaries_dir) if patient_lower in name), None)
+    if pain_path:
+        paths['pain_diary_path'] = pain_path  # Use pain_diary_path for consistency
+
+    # Weight data - find the specific file matching the patient name
+    weight_file = weight_data_dir / f"{patient_lower}.json"
+    if weight_file.exists():
+        paths['weight_data_path'] = str(weight_file)
+
+    return MappingProxyType(paths)
+
+
+def discover_patient_file_paths(patient_name: str, patient_dir: Path) -> Mapping[str, str]:
+    """
+    Discover all available file paths for a patient.
+
+    Args:
+        patient_name: Name of the patient (e.g., 'allen', 'mark', 'zach')
+        patient_dir: The patient data directory to search
+
+    Returns:
+        Read-only mapping of path keys to absolute file paths; callers that
+        need to modify it should take a copy with dict()
+    """
+    mtime_key = (_mtime_ns(patient_dir),) + tuple(_mtime_ns(directory) for directory in _data_dirs(patient_dir))
+    return _discover_paths(patient_name.lower(), patient_dir, mtime_key)
+
+
+def process_temporal_data(patient_name: str, patient_dir: Path,
+                          file_paths: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    """
+    Process temporal data (weight and pain diary) by converting offset_ms to actual timestamps.
+    The parsed files are cached until they change; the timestamps are recomputed on every call
+    because they are relative to the current time.
+
+    Args:
+        patient_name: Name of the patient
+        patient_dir: The patient data directory to read from
+        file_paths: Paths from discover_patient_file_paths, if the caller already has them
+
+    Returns:
+        Dictionary with processed temporal data
+    """
+    temporal_data = {
+        'weight_data': [],
+        'pain_diary_data': []
+    }
+
+    try:
+        # Reuse the discovered paths rather than scanning the data directories a second time
+        if file_paths is None:
+            file_paths = discover_patient_file_paths(patient_name, patient_dir)
+        weight_file = file_paths.get('weight_data_path')
+        pain_file = file_paths.get('pain_diary_path')
+
+        # Both loads are almost always cache hits, so read them directly rather than through a pool
+        weight_data = _load_json(weight_file)
+        pain_data = _load_json(pain_file)
+
+        temporal_data['weight_data'] = _timestamp_entries(weight_data)
+        temporal_data['pain_diary_data'] = _timestamp_entries(pain_data)
+
+        logger.info(
+            "🕒 Processed temporal data for %s: %d weight entries, %d pain diary entries",
+            patient_name, len(temporal_data['weight_data']), len(temporal_data['pain_diary_data'])
+        )
+
+    except Exception as e:
+        logger.warning("⚠️ Could not process temporal data for %s: %s", patient_name, e)
+
+    return temporal_data
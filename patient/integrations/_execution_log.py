@@ -0,0 +1,271 @@
+"""
+Execution log writing shared by the framework integrations.
+Each analysis run streams its events and progress through a LogFlusher, which keeps
+the <timestamp>_<Patient>_execution_log.json file the monitor UI polls up to date.
+"""
+
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# orjson is an optional speedup for the log and output file serialization
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def dumps_json(obj: Any, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, with orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=str, option=option)
+    return json.dumps(obj, indent=2 if indent else None, default=str, ensure_ascii=False).encode('utf-8')
+
+
+def loads_json(data: bytes) -> Any:
+    """Parse JSON bytes, with orjson when it is installed."""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def atomic_write_json(path: Path, obj: Any, indent: bool = False):
+    """
+    Write obj as JSON to path by swapping in a fully written temp file, so readers never see
+    a partial file. The temp file is not named *.tmp, so the integrations' temp file cleanup
+    can't remove it mid-write. No fsync: these files are advisory and rebuilt on the next write.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.swap')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dumps_json(obj, indent=indent))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class LogFlusher:
+    """
+    Batches execution log writes for a single analysis run on a background thread.
+    add_event/add_progress only enqueue; a daemon writer thread serializes the
+    entries and appends them to a JSON Lines sidecar file that stays open for
+    the whole run, so the analysis never waits on log I/O. The execution log itself
+    only holds a small status header plus the latest progress entry (what the
+    UI polls), and is swapped in atomically when progress changes. Writes are
+    flushed at most every FLUSH_INTERVAL seconds or every FLUSH_BATCH_SIZE new
+    entries, and close() stops the writer and folds the sidecar back into the
+    execution log so the final log has the usual shape. If the queue fills up, the
+    oldest entry is dropped and counted in dropped_entries, which close() reports.
+    """
+    
+    FLUSH_INTERVAL = 0.5
+    FLUSH_BATCH_SIZE = 32
+    QUEUE_SIZE = 1024
+    CLOSE_TIMEOUT = 2.0
+    # Repeats of the same (percent, status) within this many seconds are dropped
+    PROGRESS_DEDUP_WINDOW = 0.25
+    
+    def __init__(self, execution_log_file: Path, execution_log: Dict[str, Any],
+                 thread_name: str = "execution-log-writer"):
+        self.execution_log_file = execution_log_file
+        self.execution_log = execution_log
+        self.entries_file = execution_log_file.with_suffix('.jsonl')
+        self._entries_fh = open(self.entries_file, 'wb', buffering=1 << 16)
+        self._header = dict(execution_log)
+        # Entries are stamped with a monotonic offset when queued and turned into wall-clock
+        # ISO strings by the writer, so the analysis thread never formats timestamps
+        self._t0_wall = datetime.now()
+        self._t0_ns = time.perf_counter_ns()
+        self._last_visible_progress = None
+        self._last_progress = None
+        self.last_flush_ts = 0.0
+        self.dirty = False
+        self._pending_entries = 0
+        # Entries evicted from a full queue, reported in the final execution log
+        self.dropped_entries = 0
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._writer = threading.Thread(target=self._run, name=thread_name, daemon=True)
+        self._writer.start()
+    
+    def add_event(self, event: Dict[str, Any]):
+        """Queue an event for the JSON Lines sidecar; the writer adds its timestamp."""
+        self._enqueue(("event", (time.perf_counter_ns(), event)))
+    
+    def add_progress(self, progress_entry: Dict[str, Any]):
+        """Queue a progress entry and make it the latest progress in the execution log."""
+        # Coalesce bursts of identical updates (e.g. streamed from an LLM callback) into one entry
+        now = time.monotonic()
+        key = (progress_entry.get("percent"), progress_entry.get("status"))
+        if self._last_progress is not None:
+            last_key, last_ts = self._last_progress
+            if key == last_key and now - last_ts < self.PROGRESS_DEDUP_WINDOW:
+                return
+        self._last_progress = (key, now)
+        self.execution_log["progress"] = [progress_entry]
+        self._enqueue(("progress", (time.perf_counter_ns(), progress_entry, dict(self.execution_log))))
+    
+    def add_step(self, event: Dict[str, Any], progress_entry: Dict[str, Any]):
+        """Queue an event together with the progress entry it goes with, so both land in one write."""
+        self._last_progress = ((progress_entry.get("percent"), progress_entry.get("status")), time.monotonic())
+        self.execution_log["progress"] = [progress_entry]
+        self._enqueue(("step", (time.perf_counter_ns(), event, progress_entry, dict(self.execution_log))))
+    
+    def record_step(self, event_type: str, message: str, percent: int, status: str,
+                    progress_message: Optional[str] = None, data: Optional[Dict[str, Any]] = None):
+        """Build an event and its progress entry, update the run's status and queue them as one step."""
+        event = {
+            "type": event_type,
+            "message": message
+        }
+        if data:
+            event["data"] = data
+        progress_entry = {
+            "percent": percent,
+            "status": status
+        }
+        if progress_message:
+            progress_entry["message"] = progress_message
+        self.execution_log["status"] = status
+        self.execution_log["progress_percent"] = percent
+        self.add_step(event, progress_entry)
+    
+    def mark_dirty(self):
+        """Queue a rewrite of the status header from the current execution log."""
+        self._enqueue(("header", dict(self.execution_log)))
+    
+    def flush(self):
+        """Ask the writer to flush everything queued so far without waiting for the batch window."""
+        self._enqueue(("flush", None))
+    
+    def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Drop the oldest entry rather than block the analysis on log I/O
+            try:
+                self._queue.get_nowait()
+                self.dropped_entries += 1
+            except queue.Empty:
+                pass
+            self._queue.put_nowait(item)
+    
+    def _run(self):
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.FLUSH_INTERVAL)
+                except queue.Empty:
+                    self._flush()
+                    continue
+                if item is None:
+                    break
+                try:
+                    self._handle(item)
+                except Exception as e:
+                    logger.warning("⚠️ Could not write execution log entry: %s", e)
+            self._flush()
+        finally:
+            # The writer thread owns the sidecar handle for the whole run, so it also closes it
+            self._entries_fh.close()
+    
+    def _handle(self, item):
+        kind, payload = item
+        if kind == "flush":
+            self._flush()
+            return
+        if kind == "event":
+            self._write_event(*payload)
+        elif kind == "progress":
+            self._write_progress(*payload)
+        elif kind == "step":
+            queued_ns, event, progress_entry, header = payload
+            self._write_event(queued_ns, event)
+            self._write_progress(queued_ns, progress_entry, header)
+        elif kind == "header":
+            # Keep the latest progress entry the writer already stamped
+            self._header = {**payload, "progress": self._header.get("progress", [])}
+            self.dirty = True
+        self._pending_entries += 1
+        if (time.monotonic() - self.last_flush_ts > self.FLUSH_INTERVAL
+                or self._pending_entries >= self.FLUSH_BATCH_SIZE):
+            self._flush()
+    
+    def _write_event(self, queued_ns: int, event: Dict[str, Any]):
+        self._entries_fh.write(dumps_json({"timestamp": self._iso_at(queued_ns), **event}) + b'\n')
+    
+    def _write_progress(self, queued_ns: int, progress_entry: Dict[str, Any], header: Dict[str, Any]):
+        progress_entry = {"timestamp": self._iso_at(queued_ns), **progress_entry}
+        self._entries_fh.write(dumps_json({"kind": "progress", **progress_entry}) + b'\n')
+        # Only rewrite the status header when something the UI shows has changed
+        visible = (progress_entry.get("status"), progress_entry.get("percent"), progress_entry.get("message"))
+        if visible != self._last_visible_progress:
+            self._last_visible_progress = visible
+            self._header = {**header, "progress": [progress_entry]}
+            self.dirty = True
+    
+    def _iso_at(self, perf_ns: int) -> str:
+        return (self._t0_wall + timedelta(microseconds=(perf_ns - self._t0_ns) // 1000)).isoformat()
+    
+    def _flush(self):
+        if self._pending_entries:
+            self._entries_fh.flush()
+        
+        if self.dirty:
+            # In-flight headers are compact; only the final consolidated log is pretty-printed
+            self._write_summary(self._header, indent=False)
+        
+        self._pending_entries = 0
+        self.last_flush_ts = time.monotonic()
+    
+    def close(self):
+        """Stop the writer, then consolidate the streamed entries into the final execution log."""
+        if not self._writer.is_alive():
+            return
+        self._queue.put(None)
+        self._writer.join(timeout=self.CLOSE_TIMEOUT)
+        if self.dropped_entries:
+            logger.warning("⚠️ Execution log queue overflowed; dropped %d entries for %s",
+                           self.dropped_entries, self.execution_log_file.name)
+        if self._writer.is_alive():
+            logger.warning("⚠️ Execution log writer did not finish; leaving entries in %s", self.entries_file.name)
+            return
+        
+        try:
+            progress, events = [], []
+            with open(self.entries_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = loads_json(line)
+                    if entry.pop("kind", None) == "progress":
+                        progress.append(entry)
+                    else:
+                        events.append(entry)
+            log = {**self.execution_log, "progress": progress, "events": events}
+            if self.dropped_entries:
+                log["dropped_entries"] = self.dropped_entries
+            self._write_summary(log, indent=True)
+            self.entries_file.unlink()
+        except Exception as e:
+            logger.warning("⚠️ Could not consolidate execution log entries: %s", e)
+    
+    def _write_summary(self, log: Dict[str, Any], indent: bool):
+        # Swap the file in atomically so the polling UI never reads a partial write
+        try:
+            atomic_write_json(self.execution_log_file, log, indent=indent)
+            self.dirty = False
+        except Exception as e:
+            logger.warning("⚠️ Could not write execution log: %s", e)
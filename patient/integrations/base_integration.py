@@ -4,64 +4,100 @@ All framework-specific integrations should inherit from this class.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Any, Mapping, Optional
 from pathlib import Path
-from datetime import datetime, timedelta
-import json
+import itertools
+import threading
 import time
 
+from . import _discovery
+
+# Resolve the patient data directory once at import time
+_PATIENT_DIR = Path(__file__).resolve().parent.parent
+
+# Output files every framework writes as <timestamp>_<Patient>_<output_type>.json
+OUTPUT_TYPES = ('triage_decision', 'medical_log', 'biometric_analysis')
+
+# Characters replaced with '_' so a run_id is safe to use in file names
+_RUN_ID_TABLE = str.maketrans({' ': '_', '/': '_', '\\': '_'})
+
+# Per-process sequence appended to generated run_ids so runs started in the same instant stay distinct
+_run_counter = itertools.count()
+
+
+@dataclass(slots=True)
+class PerformanceMetrics:
+    """Performance metrics collected for a single integration run."""
+    duration_ms: Optional[int] = None
+    tokens_used: Optional[int] = None
+    tool_calls: Optional[int] = None
+    steps_completed: Optional[int] = None
+    success: bool = True
+    error_message: Optional[str] = None
+
+
+@dataclass(slots=True)
+class RunContext:
+    """Per-run tracking state, kept per thread so concurrent runs on one integration don't share it."""
+    start_ns: Optional[int] = None
+    metrics: PerformanceMetrics = field(default_factory=PerformanceMetrics)
+
 
 class BaseIntegration(ABC):
     """Abstract base class for agentic monitoring integrations."""
     
     def __init__(self):
         """Initialize the integration with performance tracking."""
-        self._performance_start_time = None
-        self._performance_metrics = {
-            'duration_ms': None,
-            'tokens_used': None,
-            'tool_calls': None,
-            'steps_completed': None,
-            'success': True,
-            'error_message': None
-        }
+        self._patient_dir = _PATIENT_DIR
+        self._run_local = threading.local()
+    
+    @staticmethod
+    def _normalize_run_id(run_id: Optional[str] = None) -> str:
+        """Return run_id made safe for file names, or a fresh unique one if none was given."""
+        if not run_id:
+            return f"run_{time.time_ns()}_{next(_run_counter)}"
+        return str(run_id).translate(_RUN_ID_TABLE)
+    
+    @property
+    def _run_context(self) -> RunContext:
+        """The RunContext of the run executing on the current thread."""
+        context = getattr(self._run_local, "context", None)
+        if context is None:
+            context = self._run_local.context = RunContext()
+        return context
+    
+    @property
+    def _performance_metrics(self) -> PerformanceMetrics:
+        return self._run_context.metrics
     
     def _start_performance_tracking(self):
         """Start tracking performance metrics. Override if custom tracking is needed."""
-        self._performance_start_time = time.time()
-        self._performance_metrics = {
-            'duration_ms': None,
-            'tokens_used': None,
-            'tool_calls': None,
-            'steps_completed': None,
-            'success': True,
-            'error_message': None
-        }
+        self._run_local.context = RunContext(start_ns=time.perf_counter_ns())
     
     def _end_performance_tracking(self, success: bool = True, error_message: Optional[str] = None):
         """End performance tracking and calculate duration. Override if custom tracking is needed."""
-        if self._performance_start_time:
-            duration_ms = int((time.time() - self._performance_start_time) * 1000)
-            self._performance_metrics.update({
-                'duration_ms': duration_ms,
-                'success': success,
-                'error_message': error_message
-            })
+        context = self._run_context
+        if context.start_ns is not None:
+            metrics = context.metrics
+            metrics.duration_ms = (time.perf_counter_ns() - context.start_ns) // 1_000_000
+            metrics.success = success
+            metrics.error_message = error_message
     
     def _add_performance_metrics(self, tokens_used: Optional[int] = None, 
                                 tool_calls: Optional[int] = None, 
                                 steps_completed: Optional[int] = None):
         """Add additional performance metrics. Override if custom tracking is needed."""
         if tokens_used is not None:
-            self._performance_metrics['tokens_used'] = tokens_used
+            self._performance_metrics.tokens_used = tokens_used
         if tool_calls is not None:
-            self._performance_metrics['tool_calls'] = tool_calls
+            self._performance_metrics.tool_calls = tool_calls
         if steps_completed is not None:
-            self._performance_metrics['steps_completed'] = steps_completed
+            self._performance_metrics.steps_completed = steps_completed
     
     def _get_performance_metrics(self) -> Dict[str, Any]:
         """Get the current performance metrics. Override if custom tracking is needed."""
-        return self._performance_metrics.copy()
+        return asdict(self._performance_metrics)
     
     @abstractmethod
     def run_agentic_analysis(self, patient_name: str, run_id: Optional[str] = None) -> Dict[str, Any]:
@@ -96,7 +132,7 @@ class BaseIntegration(ABC):
         """
         return getattr(self, 'framework_name', 'Unknown Framework')
     
-    def _discover_patient_file_paths(self, patient_name: str) -> Dict[str, str]:
+    def _discover_patient_file_paths(self, patient_name: str) -> Mapping[str, str]:
         """
         Discover all available file paths for a patient.
         This method centralizes path discovery so any framework can use the same paths.
@@ -105,108 +141,25 @@ class BaseIntegration(ABC):
             patient_name: Name of the patient (e.g., 'allen', 'mark', 'zach')
             
         Returns:
-            Dictionary mapping path keys to absolute file paths
+            Read-only mapping of path keys to absolute file paths; callers that
+            need to modify it should take a copy with dict()
         """
-        # Get the patient directory (where this file is located)
-        patient_dir = Path(__file__).parent.parent
-        
-        # Discover all available paths
-        paths = {}
-        
-        # Patient summary files
-        summary_file = patient_dir / f"{patient_name.lower()}_biometric_summary.json"
-        if summary_file.exists():
-            paths['patient_summary_path'] = str(summary_file)
-        
-        # FHIR records - find the specific file matching the patient name
-        fhir_dir = patient_dir / "generated_medical_records" / "fhir"
-        if fhir_dir.exists():
-            # Look for files that contain the patient name (case-insensitive)
-            for fhir_file in fhir_dir.glob("*.json"):
-                if patient_name.lower() in fhir_file.name.lower():
-                    paths['fhir_records_path'] = str(fhir_file)
-                    break
-        
-        # Pain diaries - find the specific file matching the patient name
-        pain_diaries_dir = patient_dir / "generated_medical_records" / "pain_diaries"
-        if pain_diaries_dir.exists():
-            for pain_file in pain_diaries_dir.glob("*.json"):
-                if patient_name.lower() in pain_file.name.lower():
-                    paths['pain_diary_path'] = str(pain_file)  # Use pain_diary_path for consistency
-                    break
-        
-        # Weight data - find the specific file matching the patient name
-        weight_data_dir = patient_dir / "biometric" / "weight"
-        if weight_data_dir.exists():
-            weight_file = weight_data_dir / f"{patient_name.lower()}.json"
-            if weight_file.exists():
-                paths['weight_data_path'] = str(weight_file)  # Changed from weight_data_dir
-        
-        return paths
+        return _discovery.discover_patient_file_paths(patient_name, self._patient_dir)
     
-    def _process_temporal_data(self, patient_name: str) -> Dict[str, Any]:
+    def _process_temporal_data(self, patient_name: str, file_paths: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
         """
         Process temporal data (weight and pain diary) by converting offset_ms to actual timestamps.
         
         Args:
             patient_name: Name of the patient
+            file_paths: Paths already returned by _discover_patient_file_paths, if the caller has them
             
         Returns:
             Dictionary with processed temporal data
         """
-        temporal_data = {
-            'weight_data': [],
-            'pain_diary_data': []
-        }
-        
-        try:
-            # Process weight data
-            weight_file = Path(__file__).parent.parent / "biometric" / "weight" / f"{patient_name.lower()}.json"
-            if weight_file.exists():
-                with open(weight_file, 'r') as f:
-                    weight_data = json.load(f)
-                
-                for entry in weight_data:
-                    if isinstance(entry, dict) and 'offset_ms' in entry:
-                        # Convert offset_ms (milliseconds BEFORE current time) to actual timestamp
-                        current_time = datetime.now()
-                        offset_seconds = entry['offset_ms'] / 1000
-                        timestamp = current_time - timedelta(seconds=offset_seconds)
-                        
-                        processed_entry = entry.copy()
-                        processed_entry['timestamp'] = timestamp.isoformat()
-                        temporal_data['weight_data'].append(processed_entry)
-            
-            # Process pain diary data
-            pain_diaries_dir = Path(__file__).parent / "generated_medical_records" / "pain_diaries"
-            if pain_diaries_dir.exists():
-                for pain_file in pain_diaries_dir.glob("*.json"):
-                    if patient_name.lower() in pain_file.name.lower():
-                        with open(pain_file, 'r') as f:
-                            pain_data = json.load(f)
-                        
-                        for entry in pain_data:
-                            if isinstance(entry, dict) and 'offset_ms' in entry:
-                                # Convert offset_ms (milliseconds BEFORE current time) to actual timestamp
-                                current_time = datetime.now()
-                                offset_seconds = entry['offset_ms'] / 1000
-                                timestamp = current_time - timedelta(seconds=offset_seconds)
-                                
-                                processed_entry = entry.copy()
-                                processed_entry['timestamp'] = timestamp.isoformat()
-                                temporal_data['pain_diary_data'].append(processed_entry)
-                        break
-            
-            print(f"   🕒 Processed temporal data for {patient_name}:")
-            print(f"      Weight entries: {len(temporal_data['weight_data'])}")
-            print(f"      Pain diary entries: {len(temporal_data['pain_diary_data'])}")
-            
-        except Exception as e:
-            print(f"   ⚠️ Warning: Could not process temporal data for {patient_name}: {e}")
-        
-        return temporal_data
+        return _discovery.process_temporal_data(patient_name, self._patient_dir, file_paths)
     
-    def get_framework_data_paths(self, patient_name: str) -> Dict[str, str]:
+    def get_framework_data_paths(self, patient_name: str) -> Mapping[str, str]:
         """
         Get all available data paths for a patient.
         This method can be called by any framework to get the same path information.
@@ -215,6 +168,6 @@ class BaseIntegration(ABC):
             patient_name: Name of the patient (e.g., 'allen', 'mark', 'zach')
             
         Returns:
-            Dictionary mapping path keys to absolute file paths
+            Read-only mapping of path keys to absolute file paths
         """
         return self._discover_patient_file_paths(patient_name)
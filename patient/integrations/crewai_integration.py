@@ -3,50 +3,274 @@ CrewAI integration for agentic monitoring.
 Handles CrewAI-specific setup and execution.
 """
 
+import copy
+import hashlib
 import json
-import tempfile
+import logging
+import os
 import sys
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, Union
 from datetime import datetime
 
+from .base_integration import OUTPUT_TYPES, BaseIntegration
+from ._discovery import json_mtimes
+from ._execution_log import LogFlusher, atomic_write_json, dumps_json, loads_json
+
+try:
+    # When imported as part of the patient package
+    from ..agentic_data_loader import AgenticPatientDataLoader
+    AGENTIC_DATA_LOADER_AVAILABLE = True
+except ImportError:
+    try:
+        # When the patient directory itself is on sys.path
+        from agentic_data_loader import AgenticPatientDataLoader
+        AGENTIC_DATA_LOADER_AVAILABLE = True
+    except ImportError:
+        AGENTIC_DATA_LOADER_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Resolve the directories this integration works with once at import
+_MODULE_DIR = Path(__file__).resolve().parent
+_PATIENT_DIR = _MODULE_DIR.parent
+_WORKSPACE_ROOT = _PATIENT_DIR.parent
+_CREW_SRC_DIR = _WORKSPACE_ROOT / "crew" / "cardio_monitor" / "src"
+_LOGS_DIR = _PATIENT_DIR / "agentic_monitor_logs"
+_BIOMETRIC_BUFFER = _PATIENT_DIR / "biometric" / "buffer" / "simulation_biometrics.json"
+_WEIGHT_DATA_DIR = _PATIENT_DIR / "biometric" / "weight"
+
+# String forms for the crew inputs, so runs build them without Path allocations
+_BIOMETRIC_BUFFER_STR = str(_BIOMETRIC_BUFFER)
+_WEIGHT_DATA_DIR_STR = str(_WEIGHT_DATA_DIR)
+
+
+
+def _add_to_sys_path(path: Path):
+    """Put a directory at the front of sys.path unless it is already there."""
+    path_str = str(path)
+    if path_str not in sys.path:
+        sys.path.insert(0, path_str)
+
+
 # Add the crew directory to the path so we can import CrewAI modules
-crew_path = Path(__file__).parent.parent.parent / "crew"
-if crew_path.exists():
-    sys.path.insert(0, str(crew_path))
+_crew_path = _WORKSPACE_ROOT / "crew"
+if _crew_path.exists():
+    _add_to_sys_path(_crew_path)
+
+_LOGS_DIR.mkdir(exist_ok=True)
+
+# Crew inputs that are the same for every run
+_STATIC_INPUTS = {
+    'topic': 'Cardio Monitoring Analysis',
+    'biometric_buffer_path': _BIOMETRIC_BUFFER_STR,
+    'framework': 'crewai'  # Add framework information for the agents
+}
+
+# Opt-in cache of crew results (CREWAI_PLAN_CACHE=1), keyed on the inputs that change between runs
+# and on the live biometric buffer the crew reads from disk
+_PLAN_CACHE_DIR = _LOGS_DIR / "plan_cache"
+_PLAN_CACHE_TTL = 3600  # seconds
+_PLAN_CACHE_KEYS = ('patient_name', 'processed_weight_data', 'processed_pain_diary_data', 'patient_context')
+
+# Output formatting, plan caching and temp file cleanup run here after the result is returned;
+# the interpreter waits for these workers at exit, so queued work still finishes on shutdown
+_POST_RUN_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="crewai-post-run")
+
+
+@lru_cache(maxsize=1)
+def _get_crew_class():
+    """Import the CardioMonitor crew class once per process; the import pulls in crewai."""
+    _add_to_sys_path(_CREW_SRC_DIR)
+    from cardio_monitor.crew import CardioMonitor
+    return CardioMonitor
+
+
+@lru_cache(maxsize=32)
+def _cached_patient_context(patient_name: str, agent_type: str, max_tokens: int, mtime_key: Tuple) -> Dict[str, Any]:
+    """
+    Build the context a given agent type sees for a patient.
+    mtime_key snapshots the files the loader reads, so the cached context is rebuilt when they change.
+    """
+    data_loader = AgenticPatientDataLoader(patient_name, _PATIENT_DIR)
+    return data_loader.get_agent_specific_context(agent_type, max_tokens=max_tokens)
+
+
+def _error_details(e: Exception) -> Tuple[Dict[str, Any], str]:
+    """
+    Describe a failure for the execution log and the console.
+    The full traceback is only formatted when CARE_GUARD_VERBOSE_TB=1; otherwise just the error and its type.
+    """
+    details = {"error": str(e), "error_type": type(e).__name__}
+    if os.environ.get("CARE_GUARD_VERBOSE_TB") != "1":
+        return details, ""
+    tb = traceback.format_exception(type(e), e, e.__traceback__)
+    details["traceback"] = tb
+    return details, "\n" + "".join(tb).rstrip()
+
+
+def _summarize_result(result: Any) -> Dict[str, Any]:
+    """
+    Describe a crew result for the execution log without stringifying the whole object.
+    run() returns the task's pydantic model, its json_dict or the raw text; a CrewOutput
+    carries all three.
+    """
+    pydantic = getattr(result, 'pydantic', result if hasattr(result, 'model_dump') else None)
+    json_dict = getattr(result, 'json_dict', result if isinstance(result, dict) else None)
+    raw = getattr(result, 'raw', result if isinstance(result, str) else None)
+    return {
+        "type": type(result).__name__,
+        "raw_len": len(raw) if isinstance(raw, str) else 0,
+        "json_dict": json_dict,
+        "pydantic": pydantic.model_dump() if hasattr(pydantic, 'model_dump') else None
+    }
+
+
+def _plan_cache_path(inputs: Dict[str, Any]) -> Path:
+    """Return the plan cache file for a set of crew inputs."""
+    material = {}
+    for key in _PLAN_CACHE_KEYS:
+        value = inputs.get(key)
+        if key.startswith('processed_') and isinstance(value, list):
+            # The timestamps are recomputed from the current time on every run, so leave them out of the key
+            value = [{k: v for k, v in entry.items() if k != 'timestamp'} for entry in value]
+        elif key == 'patient_context' and isinstance(value, dict):
+            # The loader stamps each context with the current time; it says nothing about the data
+            value = {k: v for k, v in value.items() if k != 'analysis_timestamp'}
+        material[key] = value
+    
+    # The crew analyses the biometric buffer itself, so any write to it must miss the cache
+    try:
+        buffer_stat = os.stat(_BIOMETRIC_BUFFER_STR)
+        material['biometric_buffer'] = (buffer_stat.st_mtime_ns, buffer_stat.st_size)
+    except FileNotFoundError:
+        material['biometric_buffer'] = None
+    return _PLAN_CACHE_DIR / f"{hashlib.blake2b(dumps_json(material), digest_size=16).hexdigest()}.json"
+
 
-from .base_integration import BaseIntegration
+def _read_plan_cache(cache_path: Path) -> Optional[Dict[str, Any]]:
+    """Load a plan cache entry, or None if it is missing, expired or unreadable."""
+    try:
+        if time.time() - cache_path.stat().st_mtime > _PLAN_CACHE_TTL:
+            return None
+        with open(cache_path, 'rb') as f:
+            return loads_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_plan_cache(cache_path: Path, result: Any, output_prefix: str):
+    """Store a crew result and the output files it produced, replacing the entry atomically."""
+    outputs = {}
+    for output_type in OUTPUT_TYPES:
+        try:
+            outputs[output_type] = (_LOGS_DIR / f"{output_prefix}{output_type}.json").read_text(encoding='utf-8')
+        except OSError:
+            pass
+    entry = {"result": str(result), "created_at": datetime.now().isoformat(), "outputs": outputs}
+    
+    try:
+        _PLAN_CACHE_DIR.mkdir(exist_ok=True)
+        atomic_write_json(cache_path, entry)
+    except OSError as e:
+        logger.warning("⚠️ Could not write plan cache entry: %s", e)
+    
+    _prune_plan_cache()
+
+
+def _prune_plan_cache():
+    """Remove plan cache entries older than the TTL so the cache directory doesn't grow without bound."""
+    cutoff = time.time() - _PLAN_CACHE_TTL
+    try:
+        with os.scandir(_PLAN_CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+    except FileNotFoundError:
+        pass
+
+
+def _restore_plan_cache_outputs(entry: Dict[str, Any], output_prefix: str):
+    """Write a cached run's output files under the current run's names."""
+    for output_type, content in entry.get("outputs", {}).items():
+        try:
+            (_LOGS_DIR / f"{output_prefix}{output_type}.json").write_text(content, encoding='utf-8')
+        except OSError as e:
+            logger.warning("⚠️ Could not restore cached %s output: %s", output_type, e)
+
+
+def _reformat_output_file(output_type: str, file_path: Path):
+    """Rewrite a CrewAI output file as indented JSON unless it already is."""
+    try:
+        with open(file_path, 'rb') as f:
+            # Already pretty-printed output (a previous pass, or the task itself) is left alone;
+            # the first bytes are enough to tell, so the rest of the file is only read when needed
+            head = f.read(32)
+            if head.startswith((b'{\n  ', b'[\n  ')):
+                return
+            content = head + f.read()
+        
+        try:
+            data = loads_json(content.strip())
+        except json.JSONDecodeError:
+            logger.warning("   ⚠️ Could not parse %s as JSON, skipping formatting", output_type)
+            return
+        
+        # Formatting runs after "completed" is published, so swap the file in atomically:
+        # the UI may already be reading the outputs
+        atomic_write_json(file_path, data, indent=True)
+        logger.info("   ✅ Formatted %s output file", output_type)
+    except Exception as e:
+        logger.warning("   ⚠️ Error formatting %s file: %s", output_type, e)
 
 
 class CrewaiIntegration(BaseIntegration):
     """CrewAI-specific integration for agentic monitoring."""
     
+    # Crew instance built by the first availability check or run, shared after that
+    _probe_instance = None
+    
     def __init__(self):
         super().__init__()  # Call parent constructor
         self.framework_name = "CrewAI"
-        self.crew_module = None
-        self._load_crew_module()
+        self._crew_module = None
+        self._crew_module_loaded = False
+    
+    @property
+    def crew_module(self):
+        """The CardioMonitor crew class, imported on first use rather than at construction."""
+        if not self._crew_module_loaded:
+            self._crew_module_loaded = True
+            self._crew_module = self._load_crew_module()
+        return self._crew_module
     
     def _load_crew_module(self):
         """Load the CrewAI crew module."""
         try:
             # Try to import the cardio monitor crew using the correct path
-            import sys
-            crew_path = Path(__file__).parent.parent.parent / "crew" / "cardio_monitor" / "src"
+            crew_path = _CREW_SRC_DIR
             if crew_path.exists():
-                sys.path.insert(0, str(crew_path))
-                from cardio_monitor.crew import CardioMonitor
-                self.crew_module = CardioMonitor
-            else:
-                print(f"⚠️ Warning: Crew path not found: {crew_path}")
-                self.crew_module = None
+                return _get_crew_class()
+            logger.warning("⚠️ Crew path not found: %s", crew_path)
         except ImportError as e:
-            print(f"⚠️ Warning: Could not import CrewAI crew module: {e}")
-            self.crew_module = None
+            logger.warning("⚠️ Could not import CrewAI crew module: %s", e)
+        return None
     
         # get_framework_name is inherited from BaseIntegration
     
+    def _get_crew_instance(self):
+        """Construct the crew once per process and reuse it for later checks and runs."""
+        if CrewaiIntegration._probe_instance is None:
+            CrewaiIntegration._probe_instance = self.crew_module()
+        return CrewaiIntegration._probe_instance
+    
     def test_availability(self) -> Dict[str, Any]:
         """Test if CrewAI is available and ready to run."""
         if self.crew_module is None:
@@ -57,7 +281,7 @@ class CrewaiIntegration(BaseIntegration):
         
         try:
             # Try to create a crew instance to test availability
-            crew = self.crew_module()
+            self._get_crew_instance()
             return {
                 "available": True,
                 "message": "CrewAI is available and ready to run"
@@ -79,159 +303,99 @@ class CrewaiIntegration(BaseIntegration):
         # Start performance tracking
         self._start_performance_tracking()
         
+        # Set once the execution log exists, so the error path knows what to report and close
+        execution_log_file = None
+        log_flusher = None
+        
         try:
-            # Generate run_id if not provided
-            if not run_id:
-                # Generate a simple, clean run_id for file naming
-                run_id = f"run_{int(time.time())}"
-            else:
-                # Ensure run_id is clean for file naming (remove any special characters)
-                run_id = str(run_id).replace(' ', '_').replace('/', '_').replace('\\', '_')
+            # Generate run_id if not provided, otherwise make it safe for file naming
+            run_id = self._normalize_run_id(run_id)
             
-            print(f"🚀 Starting CrewAI analysis for {patient_name} with run_id: {run_id}")
+            logger.info("🚀 Starting CrewAI analysis for %s with run_id: %s", patient_name, run_id)
             
-            # Create logs directory
-            logs_dir = Path(__file__).parent.parent / "agentic_monitor_logs"
-            logs_dir.mkdir(exist_ok=True)
+            logs_dir = _LOGS_DIR
             
             # Use provided timestamp or generate fallback
             if timestamp:
-                print(f"✅ Using provided timestamp: {timestamp}")
+                logger.info("✅ Using provided timestamp: %s", timestamp)
                 # Ensure timestamp is in the correct format for file naming
                 formatted_timestamp = timestamp.replace('_', '_')  # Already in correct format
             else:
                 # Generate fallback timestamp
                 formatted_timestamp = datetime.now().strftime('%Y_%m_%d_%H_%M')
-                print(f"⚠️ No timestamp provided, using generated: {formatted_timestamp}")
+                logger.warning("⚠️ No timestamp provided, using generated: %s", formatted_timestamp)
             
             # Create consolidated execution log with correct naming - use proper case for consistency
             # Ensure patient_name is properly formatted for file naming (first letter capitalized)
             formatted_patient_name = patient_name.title() if patient_name else "Unknown"
+            patient_lower = patient_name.lower()
             execution_log_file = logs_dir / f"{formatted_timestamp}_{formatted_patient_name}_execution_log.json"
             execution_log = {
                 "run_id": run_id,
                 "patient_name": patient_name,
                 "started_at": datetime.now().isoformat(),
-                "events": [],
                 "progress": [],
                 "status": "starting",
                 "progress_percent": 0
             }
+            log_flusher = LogFlusher(execution_log_file, execution_log, thread_name="crewai-log-writer")
             
             # Helper function to add events to execution log
             def add_event(event_type, message, data=None):
                 event = {
-                    "timestamp": datetime.now().isoformat(),
                     "type": event_type,
                     "message": message
                 }
                 if data:
-                    # Ensure data is properly structured for JSON serialization
-                    if isinstance(data, dict):
-                        # Process nested structures to ensure they're JSON-serializable
-                        processed_data = {}
-                        for key, value in data.items():
-                            if isinstance(value, str) and value.startswith('{') and value.endswith('}'):
-                                # Try to parse as JSON if it looks like JSON
-                                try:
-                                    parsed = json.loads(value)
-                                    processed_data[key] = parsed
-                                except:
-                                    processed_data[key] = value
-                            else:
-                                processed_data[key] = value
-                        event["data"] = processed_data
-                    else:
-                        event["data"] = data
-                execution_log["events"].append(event)
-                
-                # Write updated log to file immediately for real-time UI updates
-                # Use atomic write to avoid file corruption
-                try:
-                    import tempfile
-                    import os
-                    
-                    # Create a temporary file first
-                    temp_file = execution_log_file.with_suffix('.tmp')
-                    with open(temp_file, 'w') as f:
-                        json.dump(execution_log, f, indent=2, default=str, ensure_ascii=False)
-                    
-                    # Atomic rename to avoid corruption
-                    temp_file.replace(execution_log_file)
-                except Exception as e:
-                    print(f"⚠️ Warning: Could not write execution log: {e}")
+                    # Values are stored as given; the log writer serializes them once
+                    event["data"] = data
+                # Stream the event to the log; writes are batched for real-time UI updates
+                log_flusher.add_event(event)
             
             # Helper function to add progress updates
             def add_progress(percent, status, message=None):
                 progress_entry = {
-                    "timestamp": datetime.now().isoformat(),
                     "percent": percent,
                     "status": status
                 }
                 if message:
                     progress_entry["message"] = message
-                execution_log["progress"].append(progress_entry)
                 execution_log["status"] = status
                 execution_log["progress_percent"] = percent
-                
-                # Write updated log to file immediately for real-time UI updates
-                # Use atomic write to avoid file corruption
-                try:
-                    import tempfile
-                    import os
-                    
-                    # Create a temporary file first
-                    temp_file = execution_log_file.with_suffix('.tmp')
-                    with open(temp_file, 'w') as f:
-                        json.dump(execution_log, f, indent=2, default=str, ensure_ascii=False)
-                    
-                    # Atomic rename to avoid corruption
-                    temp_file.replace(execution_log_file)
-                except Exception as e:
-                    print(f"⚠️ Warning: Could not write execution log: {e}")
+                log_flusher.add_progress(progress_entry)
             
             # Add initial event
             add_event("analysis_started", f"Starting CrewAI analysis for {patient_name}")
             add_progress(10, "starting", "Analysis initialization")
             
-            # Create crew instance
-            crew = self.crew_module()
-            
-            # Get workspace root for file paths - this should be the actual workspace root
-            workspace_root = Path(__file__).parent.parent.parent  # patient/integrations/ -> patient/ -> workspace_root
-            
-            # Process temporal data to convert offset_ms to actual timestamps
-            print(f"🕒 Processing temporal data for {patient_name}...")
-            temporal_data = self._process_temporal_data(patient_name)
+            # Make sure the crew can be built before loading patient data
+            self._get_crew_instance()
             
-            # Use AgenticPatientDataLoader to get summarized data
-            try:
-                from agentic_data_loader import AgenticPatientDataLoader
-                data_loader = AgenticPatientDataLoader(patient_name, workspace_root / 'patient')
-                patient_context = data_loader.get_agent_specific_context("care_coordination", max_tokens=15000)
-            except ImportError:
-                print("⚠️ AgenticPatientDataLoader not available, using basic context")
-                patient_context = f"Patient {patient_name} - basic context"
-            
-            # Get file paths
+            # Get file paths first (cached per directory mtime) so temporal processing can reuse them
             file_paths = self._discover_patient_file_paths(patient_name)
             
+            # Temporal data and patient context are independent reads, so load them concurrently
+            logger.info("🕒 Processing temporal data for %s...", patient_name)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                # Process temporal data to convert offset_ms to actual timestamps
+                temporal_future = executor.submit(self._process_temporal_data, patient_name, file_paths)
+                context_future = executor.submit(self._load_patient_context, patient_name)
+                temporal_data = temporal_future.result()
+                patient_context = context_future.result()
+            
             # Build inputs using the data loader approach
             inputs = {
-                'topic': 'Cardio Monitoring Analysis',
-                'current_year': str(datetime.now().year),
-                'patient_name': formatted_patient_name,  # Use formatted name for consistency
-                'biometric_buffer_path': str(workspace_root / 'patient' / 'biometric' / 'buffer' / 'simulation_biometrics.json'),
+                **_STATIC_INPUTS,
+                'current_year': execution_log['started_at'][:4],  # ISO timestamps start with the year
                 'pain_diary_path': file_paths.get('pain_diary_path', ''),
-                'weight_data_path': str(workspace_root / 'patient' / 'biometric' / 'weight' / f'{patient_name.lower()}.json'),
+                'weight_data_path': os.path.join(_WEIGHT_DATA_DIR_STR, f'{patient_lower}.json'),
                 # Template variables for output_file interpolation - these MUST match the template variables in tasks.yaml
                 'timestamp': formatted_timestamp,  # Format: YYYY_MM_DD_HH_MM
                 'run_id': run_id,        # Should be a simple string
                 'patient_name': formatted_patient_name,  # For file naming - use formatted name
                 'processed_weight_data': temporal_data['weight_data'],
                 'processed_pain_diary_data': temporal_data['pain_diary_data'],
-                'patient_context': patient_context,
-                'framework': 'crewai'  # Add framework information for the agents
+                'patient_context': patient_context
             }
             
             add_event("inputs_configured", "Analysis inputs configured", {
@@ -247,31 +411,45 @@ class CrewaiIntegration(BaseIntegration):
             add_progress(30, "running", "CrewAI execution starting")
             
             # Run the crew using the run() function from main.py
-            print(f"🤖 Starting CrewAI analysis...")
+            logger.info("🤖 Starting CrewAI analysis...")
             add_event("crew_creation", "Starting CrewAI analysis")
             add_progress(40, "running", "CrewAI analysis started")
             
             try:
-                # Import and call the run function from main.py
-                import sys
-                sys.path.insert(0, str(workspace_root / 'crew' / 'cardio_monitor' / 'src'))
+                # Import and call the run function from main.py (imported lazily: it pulls in crewai)
+                _add_to_sys_path(_CREW_SRC_DIR)
                 from cardio_monitor.main import run
                 
-                # Call the run function with our inputs dictionary
-                result = run(inputs=inputs)
+                output_prefix = f"{formatted_timestamp}_{formatted_patient_name}_"
+                cache_path = _plan_cache_path(inputs) if os.environ.get("CREWAI_PLAN_CACHE") == "1" else None
+                cached = _read_plan_cache(cache_path) if cache_path else None
+                
+                if cached is not None:
+                    # Same patient data within the TTL: reuse the earlier crew result instead of calling the LLMs
+                    logger.info("♻️ Reusing cached CrewAI result for %s (%s)", patient_name, cache_path.stem)
+                    add_event("plan_cache_hit", "Reusing cached analysis result", {"cache_key": cache_path.stem, "created_at": cached.get("created_at")})
+                    _restore_plan_cache_outputs(cached, output_prefix)
+                    result = cached.get("result")
+                else:
+                    # Make sure the UI sees the running state before CrewAI takes over
+                    log_flusher.flush()
+                    
+                    # Call the run function with our inputs dictionary
+                    result = run(inputs=inputs)
                 
                 # Final progress update
                 add_progress(100, "completed", "Analysis completed successfully")
-                add_event("analysis_completed", "Analysis completed successfully", {"result": str(result)})
+                add_event("analysis_completed", "Analysis completed successfully", {"result": _summarize_result(result)})
+                log_flusher.flush()
                 
-                # Post-process output files to ensure proper JSON formatting
-                self._format_output_files(patient_name, formatted_timestamp, run_id)
+                # Format the output files, fill the plan cache and clean up in the background
+                # so the caller gets the result without waiting on that file I/O
+                _POST_RUN_EXECUTOR.submit(
+                    self._post_process_outputs, formatted_patient_name, formatted_timestamp, run_id,
+                    result, cache_path if cached is None else None, output_prefix
+                )
                 
-                # Ensure temporary files are cleaned up
-                logs_dir = Path(__file__).parent.parent / "agentic_monitor_logs"
-                self._cleanup_temp_files(logs_dir)
-                
-                print(f"✅ CrewAI analysis completed for {patient_name}")
+                logger.info("✅ CrewAI analysis completed for %s", patient_name)
                 
                 # End performance tracking with success
                 self._end_performance_tracking(success=True)
@@ -287,11 +465,11 @@ class CrewaiIntegration(BaseIntegration):
                 }
                 
             except Exception as e:
-                print(f"❌ Error during CrewAI execution: {e}")
-                import traceback
-                traceback.print_exc()
+                # Format the error once for both the console and the structured log
+                details, tb_text = _error_details(e)
+                logger.error("❌ Error during CrewAI execution: %s%s", e, tb_text)
                 
-                add_event("analysis_failed", f"Analysis failed: {str(e)}", {"error": str(e)})
+                add_event("analysis_failed", f"Analysis failed: {str(e)}", details)
                 add_progress(0, "failed", f"Analysis failed: {str(e)}")
                 
                 # Update progress to failed
@@ -301,18 +479,17 @@ class CrewaiIntegration(BaseIntegration):
                     execution_log["error"] = str(e)
                     execution_log["failed_at"] = datetime.now().isoformat()
                     
-                    with open(execution_log_file, 'w') as f:
-                        json.dump(execution_log, f, indent=2, default=str, ensure_ascii=False)
-                    print(f"📊 Execution log updated: failed - 0%")
+                    log_flusher.mark_dirty()
+                    log_flusher.flush()
+                    logger.info("📊 Execution log updated: failed - 0%")
                 except Exception as e2:
-                    print(f"⚠️ Warning: Could not update execution log: {e2}")
+                    logger.warning("⚠️ Could not update execution log: %s", e2)
                 
                 # Clean up temporary files even on failure
                 try:
-                    logs_dir = Path(__file__).parent.parent / "agentic_monitor_logs"
                     self._cleanup_temp_files(logs_dir)
                 except Exception as cleanup_error:
-                    print(f"⚠️ Warning: Could not cleanup temp files: {cleanup_error}")
+                    logger.warning("⚠️ Could not cleanup temp files: %s", cleanup_error)
                 
                 # End performance tracking with failure
                 self._end_performance_tracking(success=False, error_message=str(e))
@@ -323,14 +500,23 @@ class CrewaiIntegration(BaseIntegration):
                     "run_id": run_id,
                     "patient_name": patient_name,
                     "framework": "crewai",
-                    "execution_log": str(execution_log_file) if 'execution_log_file' in locals() else None,
+                    "execution_log": str(execution_log_file),
                     "performance_metrics": self._get_performance_metrics()
                 }
             
+            finally:
+                # Always persist whatever is still batched and consolidate the events
+                log_flusher.close()
+            
         except Exception as e:
-            print(f"❌ Error in CrewAI analysis: {e}")
-            import traceback
-            traceback.print_exc()
+            details, tb_text = _error_details(e)
+            logger.error("❌ Error in CrewAI analysis: %s%s", e, tb_text)
+            
+            if log_flusher is not None:
+                # Failed while preparing the run; record why before closing the log
+                add_event("analysis_failed", f"Analysis failed: {str(e)}", details)
+                add_progress(0, "failed", f"Analysis failed: {str(e)}")
+                log_flusher.close()
             
             # End performance tracking with failure
             self._end_performance_tracking(success=False, error_message=str(e))
@@ -341,9 +527,41 @@ class CrewaiIntegration(BaseIntegration):
                 "run_id": run_id,
                 "patient_name": patient_name,
                 "framework": "crewai",
+                "execution_log": str(execution_log_file) if execution_log_file is not None else None,
                 "performance_metrics": self._get_performance_metrics()
             }
     
+    def _load_patient_context(self, patient_name: str) -> Union[str, Dict[str, Any]]:
+        """Use AgenticPatientDataLoader to get summarized data for the care coordination agent."""
+        if not AGENTIC_DATA_LOADER_AVAILABLE:
+            logger.warning("⚠️ AgenticPatientDataLoader not available, using basic context")
+            return f"Patient {patient_name} - basic context"
+        
+        # The care coordination context is built from the FHIR records and the patient's earlier logs
+        mtime_key = (
+            json_mtimes(_PATIENT_DIR / "generated_medical_records" / "fhir"),
+            json_mtimes(_LOGS_DIR, f"{patient_name.lower()}_")
+        )
+        context = _cached_patient_context(patient_name, "care_coordination", 15000, mtime_key)
+        if isinstance(context, dict):
+            # Deep copy so the crew can't mutate the nested dicts of the cached context for later runs
+            context = copy.deepcopy(context)
+            context["analysis_timestamp"] = datetime.now().isoformat()
+        return context
+    
+    def _post_process_outputs(self, patient_name: str, timestamp: str, run_id: str,
+                              result: Any, cache_path: Optional[Path], output_prefix: str):
+        """Format a finished run's output files, then store them in the plan cache if requested."""
+        try:
+            # Post-process output files to ensure proper JSON formatting (also cleans up temp files)
+            self._format_output_files(patient_name, timestamp, run_id)
+            
+            # Cache the formatted outputs so a cache hit restores them as-is
+            if cache_path:
+                _write_plan_cache(cache_path, result, output_prefix)
+        except Exception as e:
+            logger.warning("⚠️ Could not post-process output files for run %s: %s", run_id, e)
+    
     def _format_output_files(self, patient_name: str, timestamp: str, run_id: str):
         """
         Post-process output files to ensure proper JSON formatting.
@@ -351,45 +569,30 @@ class CrewaiIntegration(BaseIntegration):
         Also cleans up any temporary files.
         """
         try:
-            logs_dir = Path(__file__).parent.parent / "agentic_monitor_logs"
+            logs_dir = _LOGS_DIR
+            prefix = f"{timestamp}_{patient_name}_"
             
-            # List of output file types to format
-            output_types = [
-                'triage_decision',
-                'medical_log', 
-                'biometric_analysis'
-            ]
+            # One directory listing instead of an exists() check per output type
+            found = {}
+            for file_path in logs_dir.glob(f"{prefix}*.json"):
+                output_type = file_path.name[len(prefix):-len(".json")]
+                if output_type in OUTPUT_TYPES:
+                    found[output_type] = file_path
             
-            for output_type in output_types:
-                # Updated to match new file naming convention
-                file_path = logs_dir / f"{timestamp}_{patient_name}_{output_type}.json"
-                
-                if file_path.exists():
-                    try:
-                        # Read the raw file
-                        with open(file_path, 'r') as f:
-                            content = f.read().strip()
-                        
-                        # Try to parse as JSON and reformat
-                        try:
-                            data = json.loads(content)
-                            # Write back with proper formatting
-                            with open(file_path, 'w') as f:
-                                json.dump(data, f, indent=2, default=str, ensure_ascii=False)
-                            print(f"   ✅ Formatted {output_type} output file")
-                        except json.JSONDecodeError:
-                            print(f"   ⚠️ Could not parse {output_type} as JSON, skipping formatting")
-                            
-                    except Exception as e:
-                        print(f"   ⚠️ Error formatting {output_type} file: {e}")
-                else:
-                    print(f"   ⚠️ {output_type} output file not found: {file_path}")
+            for output_type in OUTPUT_TYPES:
+                if output_type not in found:
+                    logger.warning("   ⚠️ %s output file not found: %s", output_type, logs_dir / f"{prefix}{output_type}.json")
+            
+            # The output files are independent, so reformat them in parallel
+            if found:
+                with ThreadPoolExecutor(max_workers=len(found)) as executor:
+                    list(executor.map(_reformat_output_file, found.keys(), found.values()))
             
             # Clean up any temporary files
             self._cleanup_temp_files(logs_dir)
                     
         except Exception as e:
-            print(f"⚠️ Warning: Could not format output files: {e}")
+            logger.warning("⚠️ Could not format output files: %s", e)
     
     def _cleanup_temp_files(self, logs_dir: Path):
         """Clean up any temporary files created during execution"""
@@ -398,105 +601,8 @@ class CrewaiIntegration(BaseIntegration):
             for temp_file in temp_files:
                 try:
                     temp_file.unlink()
-                    print(f"   🗑️ Cleaned up temporary file: {temp_file.name}")
+                    logger.info("   🗑️ Cleaned up temporary file: %s", temp_file.name)
                 except Exception as e:
-                    print(f"   ⚠️ Could not remove temporary file {temp_file.name}: {e}")
-        except Exception as e:
-            print(f"   ⚠️ Error during temp file cleanup: {e}")
-
-    def _discover_patient_file_paths(self, patient_name: str) -> Dict[str, str]:
-        """Discover all available file paths for a patient."""
-        # Get the correct workspace root for file paths
-        workspace_root = Path(__file__).parent.parent.parent  # patient/integrations/ -> patient/ -> workspace_root
-        patient_dir = workspace_root / "patient"
-        
-        # Discover all available paths
-        paths = {}
-        
-        # Patient summary files
-        summary_file = patient_dir / f"{patient_name.lower()}_biometric_summary.json"
-        if summary_file.exists():
-            paths['patient_summary_path'] = str(summary_file)
-        
-        # FHIR records - find the specific file matching the patient name
-        fhir_dir = patient_dir / "generated_medical_records" / "fhir"
-        if fhir_dir.exists():
-            # Look for files that contain the patient name (case-insensitive)
-            for fhir_file in fhir_dir.glob("*.json"):
-                if patient_name.lower() in fhir_file.name.lower():
-                    paths['fhir_records_path'] = str(fhir_file)
-                    break
-        
-        # Pain diaries - find the specific file matching the patient name
-        pain_diaries_dir = patient_dir / "generated_medical_records" / "pain_diaries"
-        if pain_diaries_dir.exists():
-            for pain_file in pain_diaries_dir.glob("*.json"):
-                if patient_name.lower() in pain_file.name.lower():
-                    paths['pain_diary_path'] = str(pain_file)
-                    break
-        
-        # Weight data - find the specific file matching the patient name
-        weight_data_dir = patient_dir / "biometric" / "weight"
-        if weight_data_dir.exists():
-            weight_file = weight_data_dir / f"{patient_name.lower()}.json"
-            if weight_file.exists():
-                paths['weight_data_path'] = str(weight_file)
-        
-        return paths
-
-    def _process_temporal_data(self, patient_name: str) -> Dict[str, Any]:
-        """Process temporal data (weight and pain diary) by converting offset_ms to actual timestamps."""
-        from datetime import datetime, timedelta
-        
-        temporal_data = {
-            'weight_data': [],
-            'pain_diary_data': []
-        }
-        
-        try:
-            # Get the correct workspace root for file paths
-            workspace_root = Path(__file__).parent.parent.parent  # patient/integrations/ -> patient/ -> workspace_root
-            
-            # Process weight data
-            weight_file = workspace_root / "patient" / "biometric" / "weight" / f"{patient_name.lower()}.json"
-            if weight_file.exists():
-                with open(weight_file, 'r') as f:
-                    weight_data = json.load(f)
-                
-                for entry in weight_data:
-                    if isinstance(entry, dict) and 'offset_ms' in entry:
-                        # Convert offset_ms (milliseconds BEFORE current time) to actual timestamp
-                        current_time = datetime.now()
-                        offset_seconds = entry['offset_ms'] / 1000
-                        timestamp = current_time - timedelta(seconds=offset_seconds)
-                        
-                        processed_entry = entry.copy()
-                        processed_entry['timestamp'] = timestamp.isoformat()
-                        temporal_data['weight_data'].append(processed_entry)
-            
-            # Process pain diary data
-            pain_diaries_dir = workspace_root / "patient" / "generated_medical_records" / "pain_diaries"
-            if pain_diaries_dir.exists():
-                for pain_file in pain_diaries_dir.glob("*.json"):
-                    if patient_name.lower() in pain_file.name.lower():
-                        with open(pain_file, 'r') as f:
-                            pain_data = json.load(f)
-                        
-                        for entry in pain_data:
-                            if isinstance(entry, dict) and 'offset_ms' in entry:
-                                # Convert offset_ms (milliseconds BEFORE current time) to actual timestamp
-                                current_time = datetime.now()
-                                offset_seconds = entry['offset_ms'] / 1000
-                                timestamp = current_time - timedelta(seconds=offset_seconds)
-                                
-                                processed_entry = entry.copy()
-                                processed_entry['timestamp'] = timestamp.isoformat()
-                                temporal_data['pain_diary_data'].append(processed_entry)
-                        break
-            
-            # Temporal data processed successfully
-            
+                    logger.warning("   ⚠️ Could not remove temporary file %s: %s", temp_file.name, e)
         except Exception as e:
-            print(f"   ⚠️ Warning: Could not process temporal data for {patient_name}: {e}")
-        
-        return temporal_data
+            logger.warning("   ⚠️ Error during temp file cleanup: %s", e)
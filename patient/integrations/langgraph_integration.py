@@ -3,35 +3,86 @@ LangGraph integration for agentic monitoring.
 Handles LangGraph-specific setup and execution.
 """
 
-import json
-import tempfile
+import asyncio
+import importlib.util
+import os
 import sys
-import time
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
-from .base_integration import BaseIntegration
+from .base_integration import OUTPUT_TYPES, BaseIntegration
+from ._execution_log import LogFlusher
+
+# Execution logs live next to the CrewAI ones; resolve and create the directory once at import
+_LOGS_DIR = Path(__file__).resolve().parent.parent / "agentic_monitor_logs"
+_LOGS_DIR.mkdir(exist_ok=True)
+
+
+@lru_cache(maxsize=1)
+def _dependency_error() -> Optional[str]:
+    """Import LangGraph and LangChain OpenAI once per process; return why that failed, or None."""
+    # Check the packages are installed before paying for the imports
+    for package in ("langgraph", "langchain_openai"):
+        if importlib.util.find_spec(package) is None:
+            return f"No module named '{package}'"
+    try:
+        from langgraph.graph import StateGraph
+        from langchain_openai import ChatOpenAI
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def _summarize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Describe a workflow result for the execution log without stringifying the whole state.
+    The full outputs are already in the files the workflow writes, so only their presence is noted.
+    """
+    state = result.get("result")
+    if not isinstance(state, dict):
+        state = {}
+    return {
+        "keys": list(result),
+        "success": result.get("success"),
+        "outputs": [output_type for output_type in OUTPUT_TYPES if state.get(output_type)]
+    }
 
 
 class LangGraphIntegration(BaseIntegration):
     """LangGraph-specific integration for agentic monitoring."""
     
+    # Opt-in (LANGGRAPH_RESULT_CACHE=1) cache of successful runs keyed on (patient_name, log timestamp),
+    # so re-running the same patient and timestamp returns the earlier result instead of the workflow
+    RESULT_CACHE_SIZE = 32
+    _result_cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    _result_cache_lock = threading.Lock()
+    
     def __init__(self):
         super().__init__()
         self.framework_name = "LangGraph"
-        self.workflow_module = None
-        self._load_workflow_module()
+        self._workflow_module = None
+        self._workflow_module_loaded = False
+    
+    @property
+    def workflow_module(self):
+        """The patient monitoring workflow, imported on first use rather than at construction."""
+        if not self._workflow_module_loaded:
+            self._workflow_module_loaded = True
+            self._workflow_module = self._load_workflow_module()
+        return self._workflow_module
     
     def _load_workflow_module(self):
         """Load the LangGraph workflow module."""
         try:
             # Import the patient monitoring workflow
             from langgraph_agents.workflows.patient_monitoring_workflow import run_patient_monitoring
-            self.workflow_module = run_patient_monitoring
+            return run_patient_monitoring
         except ImportError as e:
             print(f"⚠️ Warning: Could not import LangGraph workflow module: {e}")
-            self.workflow_module = None
+            return None
     
     def test_availability(self) -> Dict[str, Any]:
         """Test if LangGraph is available and ready to run."""
@@ -41,19 +92,17 @@ class LangGraphIntegration(BaseIntegration):
                 "error": "LangGraph workflow module not available. Please ensure the langgraph_agents directory is properly set up."
             }
         
-        try:
-            # Try to import required dependencies
-            from langgraph.graph import StateGraph
-            from langchain_openai import ChatOpenAI
+        # The dependency imports are only attempted once per process
+        error = _dependency_error()
+        if error is None:
             return {
                 "available": True,
                 "message": "LangGraph is available and ready to run"
             }
-        except Exception as e:
-            return {
-                "available": False,
-                "error": f"Error testing LangGraph availability: {str(e)}"
-            }
+        return {
+            "available": False,
+            "error": f"Error testing LangGraph availability: {error}"
+        }
 
     def run_agentic_analysis(self, patient_name: str, run_id: Optional[str] = None, timestamp: Optional[str] = None) -> Dict[str, Any]:
         """Run LangGraph analysis for a patient."""
@@ -64,19 +113,11 @@ class LangGraphIntegration(BaseIntegration):
             }
         
         try:
-            # Generate run_id if not provided
-            if not run_id:
-                run_id = f"run_{int(time.time())}"
-            else:
-                # Ensure run_id is clean for file naming
-                run_id = str(run_id).replace(' ', '_').replace('/', '_').replace('\\', '_')
+            # Generate run_id if not provided, otherwise make it safe for file naming
+            run_id = self._normalize_run_id(run_id)
             
             print(f"🚀 Starting LangGraph analysis for {patient_name} with run_id: {run_id}")
             
-            # Create logs directory
-            logs_dir = Path(__file__).parent.parent / "agentic_monitor_logs"
-            logs_dir.mkdir(exist_ok=True)
-            
             # Create execution log
             if timestamp:
                 # Use provided timestamp
@@ -86,96 +127,78 @@ class LangGraphIntegration(BaseIntegration):
                 log_timestamp = datetime.now().strftime('%Y_%m_%d_%H_%M')
             
             formatted_patient_name = patient_name.title() if patient_name else "Unknown"
-            execution_log_file = logs_dir / f"{log_timestamp}_{formatted_patient_name}_execution_log.json"
+            execution_log_file = _LOGS_DIR / f"{log_timestamp}_{formatted_patient_name}_execution_log.json"
+            
+            cache_key = (patient_name, log_timestamp) if os.environ.get("LANGGRAPH_RESULT_CACHE") == "1" else None
+            if cache_key:
+                cached = self._result_cache.get(cache_key)
+                # The earlier run's execution log has the same name, so it is only reusable while it exists
+                if cached is not None and execution_log_file.exists():
+                    print(f"♻️ Reusing LangGraph result for {patient_name} from {execution_log_file.name}")
+                    return {**cached, "run_id": run_id}
             
             execution_log = {
                 "run_id": run_id,
                 "patient_name": patient_name,
                 "started_at": datetime.now().isoformat(),
-                "events": [],
                 "progress": [],
                 "status": "starting",
                 "progress_percent": 0
             }
+            # Events and progress are appended to a JSON Lines sidecar instead of rewriting the whole
+            # log each time; close() folds them back into the execution log when the run ends
+            log_flusher = LogFlusher(execution_log_file, execution_log, thread_name="langgraph-log-writer")
             
-            # Helper function to add events to execution log
-            def add_event(event_type, message, data=None):
-                event = {
-                    "timestamp": datetime.now().isoformat(),
-                    "type": event_type,
-                    "message": message
-                }
-                if data:
-                    event["data"] = data
-                execution_log["events"].append(event)
+            try:
+                # Add initial event
+                log_flusher.record_step("analysis_started", f"Starting LangGraph analysis for {patient_name}",
+                                        10, "starting", "Analysis initialization")
                 
-                # Write updated log to file
-                try:
-                    with open(execution_log_file, 'w') as f:
-                        json.dump(execution_log, f, indent=2, default=str)
-                except Exception as e:
-                    print(f"⚠️ Warning: Could not write execution log: {e}")
-            
-            # Helper function to add progress updates
-            def add_progress(percent, status, message=None):
-                progress_entry = {
-                    "timestamp": datetime.now().isoformat(),
-                    "percent": percent,
-                    "status": status
-                }
-                if message:
-                    progress_entry["message"] = message
-                execution_log["progress"].append(progress_entry)
-                execution_log["status"] = status
-                execution_log["progress_percent"] = percent
-                
-                # Write updated log to file
-                try:
-                    with open(execution_log_file, 'w') as f:
-                        json.dump(execution_log, f, indent=2, default=str)
-                except Exception as e:
-                    print(f"⚠️ Warning: Could not write execution log: {e}")
-            
-            # Add initial event
-            add_event("analysis_started", f"Starting LangGraph analysis for {patient_name}")
-            add_progress(10, "starting", "Analysis initialization")
-            
-            # Run the workflow
-            add_event("workflow_started", "LangGraph workflow started")
-            add_progress(20, "running", "Workflow execution started")
-            
-            result = self.workflow_module(patient_name, run_id, timestamp=log_timestamp)
-            
-            # Update progress based on result
-            if result.get("success"):
-                add_progress(100, "completed", "Analysis completed successfully")
-                add_event("analysis_completed", "Analysis completed successfully", {"result": str(result)})
+                # Run the workflow
+                log_flusher.record_step("workflow_started", "LangGraph workflow started",
+                                        20, "running", "Workflow execution started")
+                # Make sure the UI sees the running state before the workflow takes over
+                log_flusher.flush()
                 
-                print(f"✅ LangGraph analysis completed for {patient_name}")
-                print(f"📊 Result: {result}")
-                
-                return {
-                    "success": True,
-                    "result": result,
-                    "run_id": run_id,
-                    "patient_name": patient_name,
-                    "framework": "langgraph",
-                    "execution_log": str(execution_log_file)
-                }
-            else:
-                add_event("analysis_failed", f"Analysis failed: {result.get('error', 'Unknown error')}")
-                add_progress(0, "failed", f"Analysis failed: {result.get('error', 'Unknown error')}")
+                result = self.workflow_module(patient_name, run_id, timestamp=log_timestamp)
                 
-                print(f"❌ LangGraph analysis failed: {result.get('error', 'Unknown error')}")
-                
-                return {
-                    "success": False,
-                    "error": result.get('error', 'Unknown error'),
-                    "run_id": run_id,
-                    "patient_name": patient_name,
-                    "framework": "langgraph",
-                    "execution_log": str(execution_log_file)
-                }
+                # Update progress based on result
+                if result.get("success"):
+                    log_flusher.record_step("analysis_completed", "Analysis completed successfully",
+                                            100, "completed", "Analysis completed successfully",
+                                            {"result": _summarize_result(result)})
+                    
+                    print(f"✅ LangGraph analysis completed for {patient_name}")
+                    print(f"📊 Result: {_summarize_result(result)}")
+                    
+                    response = {
+                        "success": True,
+                        "result": result,
+                        "run_id": run_id,
+                        "patient_name": patient_name,
+                        "framework": "langgraph",
+                        "execution_log": str(execution_log_file)
+                    }
+                    if cache_key:
+                        self._store_result(cache_key, response)
+                    return response
+                else:
+                    failure = f"Analysis failed: {result.get('error', 'Unknown error')}"
+                    log_flusher.record_step("analysis_failed", failure, 0, "failed", failure)
+                    
+                    print(f"❌ LangGraph analysis failed: {result.get('error', 'Unknown error')}")
+                    
+                    return {
+                        "success": False,
+                        "error": result.get('error', 'Unknown error'),
+                        "run_id": run_id,
+                        "patient_name": patient_name,
+                        "framework": "langgraph",
+                        "execution_log": str(execution_log_file)
+                    }
+            finally:
+                # Persist whatever is still queued and consolidate the sidecar into the final log
+                log_flusher.close()
                 
         except Exception as e:
             print(f"❌ Error in LangGraph analysis: {e}")
@@ -188,4 +211,35 @@ class LangGraphIntegration(BaseIntegration):
                 "run_id": run_id,
                 "patient_name": patient_name,
                 "framework": "langgraph"
-            }
\ No newline at end of file
+            }
+    
+    def _store_result(self, cache_key: Tuple[str, str], response: Dict[str, Any]):
+        """Remember a successful run, evicting the oldest entry once the cache is full."""
+        with self._result_cache_lock:
+            self._result_cache.pop(cache_key, None)
+            self._result_cache[cache_key] = dict(response)
+            while len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                del self._result_cache[next(iter(self._result_cache))]
+    
+    async def run_agentic_analysis_async(self, patient_name: str, run_id: Optional[str] = None,
+                                         timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run LangGraph analysis for a patient without blocking the event loop.
+        The workflow is synchronous (its LLM calls block), so the whole run is moved to a worker
+        thread; several patients can then be analysed concurrently from one loop.
+        """
+        return await asyncio.to_thread(self.run_agentic_analysis, patient_name, run_id, timestamp)
+    
+    async def run_agentic_analysis_batch(self, patient_names: List[str], concurrency: int = 8,
+                                         timestamp: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Run LangGraph analysis for several patients concurrently.
+        At most `concurrency` workflows run at once; results come back in the order of patient_names.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run_one(patient_name: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.run_agentic_analysis_async(patient_name, timestamp=timestamp)
+        
+        return await asyncio.gather(*(run_one(patient_name) for patient_name in patient_names))
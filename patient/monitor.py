@@ -7,7 +7,7 @@ import threading
 import time
 from pathlib import Path
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
@@ -37,6 +37,13 @@ except ImportError:
     import heartbeat_analysis
     import fhir_observations
 
+# orjson is an optional speedup for decoding server events and writing the biometric buffer
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Set page config
 st.set_page_config(
     page_title="Patient Monitor",
@@ -49,8 +56,35 @@ biometric_buffer = []
 BATCH_SIZE = 10  # Write to file every 10 events
 BUFFER_LOCK = threading.Lock()
 
+def _encode_biometric_records(records: List[dict]) -> bytes:
+    """Serialize records as the body of a JSON array, one record per line."""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        return b",\n".join(orjson.dumps(record, default=str, option=option) for record in records)
+    return ",\n".join(json.dumps(record, default=str) for record in records).encode('utf-8')
+
+def _biometric_append_position(f) -> Optional[Tuple[int, bytes]]:
+    """
+    Return the offset of the closing bracket of the JSON array in f and the separator to
+    write there before new records, reading only the tail of the file.
+    Returns None if f does not end in a complete JSON array (e.g. a write was cut off).
+    """
+    size = f.seek(0, os.SEEK_END)
+    tail_start = max(0, size - 4096)
+    f.seek(tail_start)
+    tail = f.read().rstrip()
+    if not tail.endswith(b']'):
+        return None
+    bracket = tail_start + len(tail) - 1
+    # An empty array has '[' right before ']'
+    before = tail[:-1].rstrip()
+    if not before and tail_start == 0:
+        return None
+    separator = b"\n" if before.endswith(b'[') else b",\n"
+    return bracket, separator
+
 def flush_biometric_buffer():
-    """Write all buffered biometric events to the JSON file."""
+    """Append all buffered biometric events to the JSON file."""
     global biometric_buffer
     with BUFFER_LOCK:
         if not biometric_buffer:
@@ -60,40 +94,36 @@ def flush_biometric_buffer():
             # Ensure buffer directory exists
             buffer_dir = heartbeat_analysis.ensure_biometric_buffer_dir()
             biometric_file = buffer_dir / "simulation_biometrics.json"
+            records = _encode_biometric_records(biometric_buffer)
             
-            # Load existing records
-            records = []
-            if biometric_file.exists():
-                try:
-                    with open(biometric_file, 'r') as f:
-                        records = json.load(f)
-                    if not isinstance(records, list):
-                        records = []
-                except json.JSONDecodeError as e:
-                    records = []
-                except Exception as e:
-                    records = []
-            
-            # Add all buffered records
-            records.extend(biometric_buffer)
-            
-            # Write back to file with atomic write
-            temp_file = biometric_file.with_suffix('.tmp')
             try:
-                # Ensure the directory exists before writing
-                buffer_dir.mkdir(parents=True, exist_ok=True)
+                position = None
+                if biometric_file.exists() and biometric_file.stat().st_size > 0:
+                    with open(biometric_file, 'r+b') as f:
+                        position = _biometric_append_position(f)
+                        if position is not None:
+                            # Overwrite the closing bracket with the new records and a new bracket,
+                            # so each flush writes only this batch; readers retry until the array is closed
+                            bracket, separator = position
+                            f.seek(bracket)
+                            f.write(separator + records + b"\n]")
+                            f.truncate()
+                    if position is None:
+                        # Keep an unreadable file for inspection instead of discarding its records
+                        corrupt_file = biometric_file.with_suffix('.corrupt.json')
+                        print(f"⚠️ {biometric_file.name} is not a complete JSON array, moving it to {corrupt_file.name}")
+                        biometric_file.replace(corrupt_file)
                 
-                with open(temp_file, 'w') as f:
-                    json.dump(records, f, indent=2, default=str)
-                
-                # Atomic move to replace the original file
-                if temp_file.exists() and temp_file.stat().st_size > 0:
+                if position is None:
+                    # Start a new array through a temp file, so readers never see it half-written
+                    temp_file = biometric_file.with_suffix('.tmp')
+                    with open(temp_file, 'wb') as f:
+                        f.write(b"[\n" + records + b"\n]")
                     temp_file.replace(biometric_file)
-                else:
-                    print(f"⚠️ Temp file not created properly, skipping flush")
                     
             except Exception as e:
                 # Clean up temp file if it exists
+                temp_file = biometric_file.with_suffix('.tmp')
                 if temp_file.exists():
                     try:
                         temp_file.unlink()
@@ -396,22 +426,17 @@ class HeartbeatClient:
     
     def _listen_for_biometrics(self):
         """Listen for biometric events from the server."""
-        buffer = ""
-        
-        while self.running and self.connected:
-            try:
-                data = self.socket.recv(1024)
-                if not data:
-                    break
-                
-                buffer += data.decode('utf-8')
-                
+        try:
+            # The buffered reader does the newline framing, so each message arrives as one line
+            # of bytes instead of being cut out of a growing decoded string buffer
+            with self.socket.makefile('rb', buffering=65536) as rfile:
                 # Process complete messages
-                while '\n' in buffer:
-                    message, buffer = buffer.split('\n', 1)
+                for message in rfile:
+                    if not (self.running and self.connected):
+                        break
                     if message.strip():
                         try:
-                            event = json.loads(message)
+                            event = orjson.loads(message) if ORJSON_AVAILABLE else json.loads(message)
                             event_type = event.get('event_type')
                             
                             # Record only biometric events with medical data
@@ -433,7 +458,6 @@ class HeartbeatClient:
                                     
                                 elif event_type == 'respiration':
                                     # Respiration events (discrete breath completion)
-                                    print(f'recording a respiration, for event: {event}')
                                     medical_data = {
                                         'interval_ms': event.get('interval_ms', 0)
                                     }
@@ -475,8 +499,8 @@ class HeartbeatClient:
                         except json.JSONDecodeError:
                             print('Unable to decode JSON in _listen_for_biometrics handler')
                             
-            except Exception as e:
-                break
+        except Exception as e:
+            pass
         
         self.connected = False
 
@@ -861,21 +885,6 @@ def main():
             if st.session_state.simulation_running:
                 st.info(f"🔄 Current simulation: {st.session_state.current_scenario}")
                 
-                # Show biometric recording status
-                buffer_dir = heartbeat_analysis.ensure_biometric_buffer_dir()
-                biometric_file = buffer_dir / "simulation_biometrics.json"
-                
-                # Count file records
-                file_count = 0
-                if biometric_file.exists():
-                    try:
-                        with open(biometric_file, 'r') as f:
-                            records = json.load(f)
-                        file_count = len(records) if isinstance(records, list) else 0
-                    except (json.JSONDecodeError, Exception) as e:
-                        st.error(f"❌ Error reading biometric data: {e}")
-                        file_count = 0
-                
                 # When simulation is running, only show the stop button
                 if st.button("⏹️ Stop Simulation", type="secondary"):
                     stop_heartbeat_scenario()